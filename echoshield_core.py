@@ -7,19 +7,70 @@ Focus: Voice isolation, wake word detection, Galaxy Buds integration
 import sounddevice as sd
 import numpy as np
 import threading
+import queue
 import time
 import signal
 import sys
 import os
 import json
+import re
+import hashlib
+import tempfile
 from datetime import datetime
-from collections import deque
 
 # Core imports
 import webrtcvad
-from resemblyzer import VoiceEncoder, preprocess_wav
+from resemblyzer import preprocess_wav
 import vosk
 
+from voice_filter.ring_buffer import RingBuffer
+from voice_filter.encoder import encoder_id, get_encoder, load_voice_embedding
+from voice_filter.silero_vad import SileroVAD
+from voice_filter.kernels import energy_and_pcm16
+
+# Optional: PyObjC lets us set the volume in-process instead of spawning osascript
+try:
+    from Foundation import NSAppleScript
+except ImportError:
+    NSAppleScript = None
+
+class AudioFrame:
+    """One callback's mono samples, converted to PCM16 at most once for all consumers"""
+    __slots__ = ('f32', '_i16', '_i16_bytes', '_energy', '_scratch_i')
+    
+    def __init__(self, f32, scratch_i):
+        self.f32 = f32
+        self._i16 = None
+        self._i16_bytes = None
+        self._energy = None
+        self._scratch_i = scratch_i
+    
+    def _convert(self):
+        """Compute energy and PCM16 samples in a single pass"""
+        self._i16 = self._scratch_i[:len(self.f32)]
+        self._energy = energy_and_pcm16(self.f32, self._i16)
+    
+    @property
+    def energy(self):
+        """Sum of squared samples"""
+        if self._energy is None:
+            self._convert()
+        return self._energy
+    
+    @property
+    def i16(self):
+        """PCM16 samples (backed by shared scratch, valid until the next callback)"""
+        if self._i16 is None:
+            self._convert()
+        return self._i16
+    
+    @property
+    def i16_bytes(self):
+        """PCM16 samples as bytes, for webrtcvad"""
+        if self._i16_bytes is None:
+            self._i16_bytes = self.i16.tobytes()
+        return self._i16_bytes
+
 class EchoShieldCore:
     def __init__(self):
         # Audio settings
@@ -29,35 +80,130 @@ class EchoShieldCore:
         
         # Voice isolation
         self.vad = webrtcvad.Vad(3)  # High aggressiveness
-        self.voice_encoder = VoiceEncoder()
+        # Prefer Silero VAD when onnxruntime and the model file are available
+        self.silero_model_path = "silero_vad.onnx"
+        self.silero_vad = None
+        if os.path.exists(self.silero_model_path):
+            try:
+                self.silero_vad = SileroVAD(self.silero_model_path)
+            except Exception as e:
+                print(f"⚠️  Silero VAD unavailable, using webrtcvad: {e}")
+        self.energy_threshold = 0.005  # Mean |x| below this is treated as silence
+        # Same gate on sum(x^2): 2.5 ~ (rms / mean|x|)^2 for speech-like signals
+        self._energy2_threshold = self.energy_threshold ** 2 * 2.5
+        # Scratch for the per-frame PCM16 conversion shared by VAD and wake word detection
+        self._pcm_scratch_i = np.empty(self.frame_size, dtype=np.int16)
         self.user_voice_embedding = None
+        self._emb_i8 = None  # int8 copy of the embedding used for the similarity dot product
+        self._emb_scale = 1.0
         self.voice_similarity_threshold = 0.5  # Lowered from 0.7 to be less strict
         
+        # Voice ID runs on a worker thread; the audio callback only reads the last decision
+        self.decision_lock = threading.Lock()
+        self.last_is_user = True
+        self.embed_q = queue.Queue(maxsize=4)
+        self.embed_thread = None
+        
+        # Resemblyzer needs ~1 s of speech; re-check at most every voice_id_hold seconds of speech
+        self.speech_accum = RingBuffer(self.sample_rate)
+        self.speech_since_submit = 0
+        self.voice_id_hold = 0.5
+        
         # Wake word detection
         self.vosk_model = None
         self.vosk_rec = None
         self.wake_words = ["thayaa", "excuse me", "hey echo"]
-        self.wake_word_buffer = deque(maxlen=self.sample_rate * 5)  # 5 seconds
+        self._wake_re = re.compile('|'.join(map(re.escape, self.wake_words)))  # One pass over the text
+        # Vosk is fed PCM16 in ~200 ms batches (its internal chunk size) instead of 2 s windows
+        self.wake_word_batch = np.empty(self.frame_size * 7, dtype=np.int16)
+        self.wake_word_batch_len = 0
+        self._vosk_q = queue.Queue(maxsize=64)
+        self._vosk_thread = None
         
         # Galaxy Buds
         self.galaxy_buds_connected = False
         self.ambient_mode_active = False
         self.ambient_duration = 10.0
+        self._volume_scripts = {}
+        self._volume_q = queue.SimpleQueue()  # Levels for run()'s loop; NSAppleScript is main-thread only
+        if NSAppleScript is not None:
+            for level in (100, 80):
+                self._volume_scripts[level] = self._compile_volume_script(level)
         
         # Recording
         self.recording_enabled = False
-        self.recording_buffer = []
+        self._rec_file = None
+        self._rec_q = None
+        self._rec_thread = None
         
         # Status
         self.is_running = False
+        self.status_interval = 0.2  # Max 5 status lines/s from realtime code
+        self._last_print = 0.0
         
+    @property
+    def voice_encoder(self):
+        """Shared voice encoder, loaded on first use (so runs without a voice sample never load it)"""
+        return get_encoder()
+    
+    def print_status(self, message):
+        """Rate-limited status line for the realtime path (print is too slow for every frame)"""
+        now = time.monotonic()
+        if now - self._last_print >= self.status_interval:
+            self._last_print = now
+            print(message, end='\r')
+    
+    def embedding_cache_path(self, voice_file_path):
+        """Cache file for a voice sample's embedding, keyed by the sample's contents and the encoder"""
+        with open(voice_file_path, 'rb') as f:
+            key = hashlib.sha1(f.read()).hexdigest()[:16]
+        cache_dir = os.path.join(os.path.dirname(voice_file_path), ".cache")
+        return os.path.join(cache_dir, f"{key}-{encoder_id()}.npy")
+    
+    def load_cached_embedding(self, cache_path):
+        """Return a cached embedding, or None if it is missing, unreadable or malformed"""
+        try:
+            emb = np.load(cache_path)
+        except Exception:
+            return None
+        # Embeddings are saved L2-normalized, so anything else is a torn or foreign file
+        if emb.ndim != 1 or not np.isfinite(emb).all() or abs(np.linalg.norm(emb) - 1.0) > 1e-3:
+            return None
+        return emb
+    
+    def save_cached_embedding(self, cache_path, emb):
+        """Write an embedding cache file atomically (temp file in the same directory, then rename)"""
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            np.save(f, emb)
+        try:
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    
     def load_user_voice(self, voice_file_path):
         """Load user voice sample for identification"""
         try:
             if os.path.exists(voice_file_path):
-                wav = preprocess_wav(voice_file_path)
-                self.user_voice_embedding = self.voice_encoder.embed_utterance(wav)
+                cache_path = self.embedding_cache_path(voice_file_path)
+                emb = self.load_cached_embedding(cache_path)
+                if emb is not None:
+                    self.set_user_embedding(emb)
+                    print(f"✅ Voice sample loaded (cached): {voice_file_path}")
+                    return True
+                
+                emb = load_voice_embedding(voice_file_path)  # Cached until the file changes
+                emb = emb / (np.linalg.norm(emb) + 1e-9)  # Pre-normalize so the dot product is a cosine
+                self.set_user_embedding(emb)
                 print(f"✅ Voice sample loaded: {voice_file_path}")
+                
+                try:
+                    self.save_cached_embedding(cache_path, self.user_voice_embedding)
+                except OSError as e:
+                    print(f"⚠️  Could not cache voice embedding: {e}")
                 return True
             else:
                 print(f"❌ Voice file not found: {voice_file_path}")
@@ -66,12 +212,27 @@ class EchoShieldCore:
             print(f"❌ Error loading voice sample: {e}")
             return False
     
+    def quantize_embedding(self, emb):
+        """Quantize a normalized embedding to int8 with a scalar scale"""
+        scale = float(np.abs(emb).max()) / 127.0 + 1e-12
+        return np.round(emb / scale).astype(np.int8), scale
+    
+    def set_user_embedding(self, emb):
+        """Store the user's embedding along with its int8 quantization"""
+        self.user_voice_embedding = np.ascontiguousarray(emb, dtype=np.float32)
+        self._emb_i8, self._emb_scale = self.quantize_embedding(self.user_voice_embedding)
+    
     def load_vosk_model(self, model_path):
         """Load Vosk model for wake word detection"""
         try:
             if os.path.exists(model_path):
                 self.vosk_model = vosk.Model(model_path)
                 self.vosk_rec = vosk.KaldiRecognizer(self.vosk_model, self.sample_rate)
+                
+                # Warm the decoder with silence so the first real utterance isn't lost
+                self.vosk_rec.AcceptWaveform(np.zeros(self.sample_rate * 2, dtype=np.int16).tobytes())
+                self.vosk_rec.Result()
+                self.vosk_rec.Reset()
                 print(f"✅ Vosk model loaded: {model_path}")
                 return True
             else:
@@ -109,66 +270,120 @@ class EchoShieldCore:
             
             wav = preprocess_wav(audio)
             current_embedding = self.voice_encoder.embed_utterance(wav)
-            similarity = np.dot(self.user_voice_embedding, current_embedding)
+            current_embedding /= np.linalg.norm(current_embedding) + 1e-9
+            
+            # int8 dot with int32 accumulation; error is well under the threshold margin
+            cur_i8, cur_scale = self.quantize_embedding(current_embedding)
+            dot = int(self._emb_i8.astype(np.int32) @ cur_i8.astype(np.int32))
+            similarity = dot * self._emb_scale * cur_scale
             
             # Debug output
-            print(f"🎯 Voice similarity: {similarity:.3f} (threshold: {self.voice_similarity_threshold})", end='\r')
+            self.print_status(f"🎯 Voice similarity: {similarity:.3f} (threshold: {self.voice_similarity_threshold})")
             
             return similarity > self.voice_similarity_threshold
         except Exception as e:
-            print(f"Voice ID error: {e}", end='\r')
+            self.print_status(f"Voice ID error: {e}")
             return True  # Default to allowing on error
+
+    def _embed_worker(self):
+        """Embed queued speech chunks off the audio thread and update the decision"""
+        # Only the None sentinel stops the loop, so cleanup's put always finds a consumer
+        while True:
+            chunk = self.embed_q.get()
+            if chunk is None:
+                break
+            
+            is_user = self.is_user_voice(chunk)
+            
+            with self.decision_lock:
+                self.last_is_user = is_user
     
-    def is_speech(self, audio):
-        """Check if audio contains speech"""
+    def accumulate_speech(self, audio):
+        """Collect speech frames and hand 1 s windows to the voice ID worker"""
+        self.speech_accum.write(audio)
+        self.speech_since_submit += len(audio)
+        
+        # Keep the previous decision until enough new speech has arrived
+        if len(self.speech_accum) < self.sample_rate:
+            return
+        if self.speech_since_submit < self.voice_id_hold * self.sample_rate:
+            return
+        self.speech_since_submit = 0
+        
         try:
+            self.embed_q.put_nowait(self.speech_accum.latest())
+        except queue.Full:
+            pass  # Worker is behind; the next window will catch up
+    
+    def is_silent(self, frame):
+        """Cheap energy gate run before VAD"""
+        return frame.energy < self._energy2_threshold * len(frame.f32)
+    
+    def is_speech(self, frame):
+        """Check if an audio frame contains speech"""
+        # Blocksize is fixed to one 30 ms VAD frame, so no slicing is needed; checked outside the
+        # try so a broken invariant surfaces instead of reading as "not speech"
+        assert len(frame.f32) == self.frame_size
+        try:
+            # Silero buffers its own 32 ms windows and keeps recurrent state across them, so it is
+            # fed every frame, silence included; the energy gate then only vetoes its decision
+            if self.silero_vad is not None:
+                return self.silero_vad.process(frame.f32) and not self.is_silent(frame)
+            
             # Volume check
-            audio_energy = np.mean(np.abs(audio))
-            if audio_energy < 0.005:
+            if self.is_silent(frame):
                 return False
             
             # VAD check
-            frame_length_ms = len(audio) * 1000 / self.sample_rate
-            if frame_length_ms > 30:
-                samples_30ms = int(self.sample_rate * 0.03)
-                audio = audio[-samples_30ms:]
-            
-            int16_audio = (audio * 32767).astype(np.int16).tobytes()
-            if len(int16_audio) < 320:
-                return False
-            
-            return self.vad.is_speech(int16_audio, self.sample_rate)
+            return self.vad.is_speech(frame.i16_bytes, self.sample_rate)
         except:
             return False
     
-    def process_wake_word(self, audio):
-        """Process audio for wake word detection"""
+    def match_wake_word(self, text):
+        """Return the first wake word contained in text, or None"""
+        match = self._wake_re.search(text.lower())
+        return match.group(0) if match else None
+    
+    def process_wake_word(self, frame):
+        """Batch audio for the wake word thread (cheap enough for the audio callback)"""
         if self.vosk_rec is None:
-            return False
+            return
+        
+        start = self.wake_word_batch_len
+        end = start + len(frame.f32)
+        self.wake_word_batch[start:end] = frame.i16
+        self.wake_word_batch_len = end
+        
+        if end < len(self.wake_word_batch):
+            return
+        self.wake_word_batch_len = 0
         
         try:
-            # Add to buffer
-            self.wake_word_buffer.extend(audio.tolist())
+            self._vosk_q.put_nowait(self.wake_word_batch.tobytes())
+        except queue.Full:
+            pass  # Recognizer is behind; dropping beats blocking the audio thread
+    
+    def _vosk_loop(self):
+        """Run Vosk on queued PCM16 batches and fire on wake words"""
+        while True:
+            pcm16 = self._vosk_q.get()
+            if pcm16 is None:
+                break
             
-            # Process when buffer is full
-            if len(self.wake_word_buffer) >= self.sample_rate * 2:  # 2 seconds
-                audio_chunk = np.array(list(self.wake_word_buffer))
-                audio_bytes = audio_chunk.tobytes()
+            try:
+                if self.vosk_rec.AcceptWaveform(pcm16):
+                    text = json.loads(self.vosk_rec.Result()).get('text', '')
+                else:
+                    # Partial results let us fire before Vosk closes the utterance
+                    text = json.loads(self.vosk_rec.PartialResult()).get('partial', '')
                 
-                if self.vosk_rec.AcceptWaveform(audio_bytes):
-                    result = json.loads(self.vosk_rec.Result())
-                    text = result.get('text', '').lower().strip()
-                    
-                    if text:
-                        for wake_word in self.wake_words:
-                            if wake_word in text:
-                                print(f"🚨 WAKE WORD DETECTED: '{wake_word}'")
-                                self.trigger_ambient_mode(wake_word, text)
-                                return True
-        except Exception as e:
-            print(f"Wake word processing error: {e}")
-        
-        return False
+                wake_word = self.match_wake_word(text)
+                if wake_word:
+                    print(f"🚨 WAKE WORD DETECTED: '{wake_word}'")
+                    self.vosk_rec.Reset()  # Don't fire again on the same utterance
+                    self.trigger_ambient_mode(wake_word, text)
+            except Exception as e:
+                print(f"Wake word processing error: {e}")
     
     def trigger_ambient_mode(self, wake_word, full_text):
         """Trigger ambient mode when wake word detected"""
@@ -189,12 +404,34 @@ class EchoShieldCore:
         # Auto-return to noise cancellation
         threading.Timer(self.ambient_duration, self.return_to_noise_cancellation).start()
     
+    def _compile_volume_script(self, level):
+        """Compile a 'set volume' AppleScript once so it can run in-process"""
+        script = NSAppleScript.alloc().initWithSource_(f"set volume output volume {level}")
+        script.compileAndReturnError_(None)
+        return script
+    
+    def set_output_volume(self, level):
+        """Set the system output volume (0-100)"""
+        script = self._volume_scripts.get(level)
+        if script is not None:
+            # Wake word and timer threads hand the change to the main thread
+            if threading.current_thread() is not threading.main_thread():
+                self._volume_q.put(level)
+                return
+            _, error = script.executeAndReturnError_(None)
+            if error is not None:
+                raise RuntimeError(f"AppleScript error: {error}")
+            return
+        
+        # Fallback: launch osascript (~100-200 ms per call)
+        import subprocess
+        subprocess.run(['osascript', '-e', f'set volume output volume {level}'], check=True)
+    
     def switch_galaxy_buds_ambient(self):
         """Switch Galaxy Buds to ambient mode"""
         try:
-            import subprocess
             # This is a simplified approach - real implementation would use Galaxy Buds API
-            subprocess.run(['osascript', '-e', 'set volume output volume 100'], check=True)
+            self.set_output_volume(100)
             print("🎧 Galaxy Buds switched to ambient mode")
         except:
             print("🎧 Simulated: Galaxy Buds ambient mode")
@@ -202,8 +439,7 @@ class EchoShieldCore:
     def switch_galaxy_buds_noise_cancellation(self):
         """Switch Galaxy Buds to noise cancellation"""
         try:
-            import subprocess
-            subprocess.run(['osascript', '-e', 'set volume output volume 80'], check=True)
+            self.set_output_volume(80)
             print("🔇 Galaxy Buds switched to noise cancellation")
         except:
             print("🔇 Simulated: Galaxy Buds noise cancellation")
@@ -217,55 +453,86 @@ class EchoShieldCore:
     
     def start_recording(self):
         """Start audio recording"""
+        import soundfile as sf
+        
+        os.makedirs("recordings", exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"recordings/echoshield_session_{timestamp}.wav"
+        
+        # Frames are streamed to disk by a writer thread; never write inside the audio callback
+        self._rec_file = sf.SoundFile(filename, 'w', self.sample_rate, 1, subtype='PCM_16')
+        self._rec_q = queue.Queue()
+        self._rec_thread = threading.Thread(target=self._recording_writer, daemon=True)
+        self._rec_thread.start()
+        
         self.recording_enabled = True
-        self.recording_buffer = []
         print("🎥 Recording started")
     
+    def _recording_writer(self):
+        """Drain recorded frames to the open sound file"""
+        while True:
+            chunk = self._rec_q.get()
+            if chunk is None:
+                break
+            self._rec_file.write(chunk)
+    
     def stop_recording(self):
         """Stop and save recording"""
         if self.recording_enabled:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"recordings/echoshield_session_{timestamp}.wav"
-            
-            os.makedirs("recordings", exist_ok=True)
+            self.recording_enabled = False
             
-            if self.recording_buffer:
-                audio_data = np.concatenate(self.recording_buffer)
-                import soundfile as sf
-                sf.write(filename, audio_data, self.sample_rate)
-                print(f"💾 Recording saved: {filename}")
+            self._rec_q.put(None)
+            self._rec_thread.join()
+            self._rec_file.close()
+            print(f"💾 Recording saved: {self._rec_file.name}")
             
-            self.recording_enabled = False
-            self.recording_buffer = []
+            # Keep the drained queue: a callback already past the flag check may still put into it
+            self._rec_file = None
+            self._rec_thread = None
     
-    def audio_callback(self, indata, outdata, frames, time, status):
+    def audio_callback(self, indata, outdata, frames, time_info, status):
         """Main audio processing callback"""
         if status and 'overflow' not in str(status).lower():
             print(f"Audio status: {status}")
         
-        audio = indata[:, 0]  # mono
+        # RawStream hands us the raw mono buffers; view them without copying
+        audio = np.frombuffer(indata, dtype=np.float32)
+        out = np.frombuffer(outdata, dtype=np.float32)
+        frame = AudioFrame(audio, self._pcm_scratch_i)
         
         # Add to recording buffer
         if self.recording_enabled:
-            self.recording_buffer.append(audio.copy())
+            self._rec_q.put_nowait(audio.copy())
         
-        # Process wake word detection
-        self.process_wake_word(audio)
+        # Process wake word detection (Vosk needs the continuous stream, silence included)
+        self.process_wake_word(frame)
+        
+        # Silence dominates in practice: skip VAD and voice ID entirely (Silero still needs the frame)
+        if self.silero_vad is None and self.is_silent(frame):
+            out.fill(0.0)
+            self.print_status("🔇 SILENCE → BLOCKED            ")
+            return
         
         # Voice isolation
-        is_speaking = self.is_speech(audio)
+        is_speaking = self.is_speech(frame)
         
         if is_speaking:
-            # Check if it's user's voice
-            if self.is_user_voice(audio):
-                outdata[:] = indata  # Pass through user's voice
-                print("🎤 USER VOICE → PASSING THROUGH", end='\r')
+            if self.user_voice_embedding is not None:
+                self.accumulate_speech(audio)
+            
+            # Check if it's user's voice (last decision from the worker)
+            with self.decision_lock:
+                is_user = self.last_is_user
+            
+            if is_user:
+                np.copyto(out, audio)  # Pass through user's voice
+                self.print_status("🎤 USER VOICE → PASSING THROUGH")
             else:
-                outdata[:] = np.zeros_like(indata)  # Block other voices
-                print("🔇 OTHER VOICE → BLOCKED        ", end='\r')
+                out.fill(0.0)  # Block other voices
+                self.print_status("🔇 OTHER VOICE → BLOCKED        ")
         else:
-            outdata[:] = np.zeros_like(indata)  # Block silence/noise
-            print("🔇 SILENCE → BLOCKED            ", end='\r')
+            out.fill(0.0)  # Block silence/noise
+            self.print_status("🔇 SILENCE → BLOCKED            ")
     
     def run(self, voice_file=None, vosk_model_path=None):
         """Run EchoShield Core"""
@@ -297,8 +564,16 @@ class EchoShieldCore:
         
         self.is_running = True
         
+        if self.user_voice_embedding is not None:
+            self.embed_thread = threading.Thread(target=self._embed_worker, daemon=True)
+            self.embed_thread.start()
+        
+        if self.vosk_rec is not None:
+            self._vosk_thread = threading.Thread(target=self._vosk_loop, daemon=True)
+            self._vosk_thread.start()
+        
         try:
-            with sd.Stream(
+            with sd.RawStream(
                 samplerate=self.sample_rate,
                 blocksize=self.frame_size,
                 dtype='float32',
@@ -308,7 +583,14 @@ class EchoShieldCore:
                 print("🎤 Listening...")
                 
                 while self.is_running:
-                    time.sleep(0.1)
+                    try:
+                        level = self._volume_q.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    try:
+                        self.set_output_volume(level)
+                    except Exception as e:
+                        print(f"⚠️  Could not set volume: {e}")
                     
         except KeyboardInterrupt:
             print("\n🛑 Stopping EchoShield Core...")
@@ -320,6 +602,20 @@ class EchoShieldCore:
     def cleanup(self):
         """Cleanup resources"""
         self.is_running = False
+        if self.embed_thread is not None:
+            try:
+                self.embed_q.put(None, timeout=1.0)  # Wake the worker so it can exit
+            except queue.Full:
+                pass
+            self.embed_thread.join(timeout=1.0)
+            self.embed_thread = None
+        if self._vosk_thread is not None:
+            try:
+                self._vosk_q.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+            self._vosk_thread.join(timeout=1.0)
+            self._vosk_thread = None
         self.stop_recording()
         print("✅ EchoShield Core stopped")
 
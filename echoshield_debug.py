@@ -10,9 +10,13 @@ import time
 import os
 import signal
 import sys
-from resemblyzer import VoiceEncoder, preprocess_wav
+from resemblyzer import preprocess_wav
 import webrtcvad
 
+from voice_filter.ring_buffer import RingBuffer
+from voice_filter.encoder import get_encoder, load_voice_embedding
+from voice_filter.kernels import energy_and_pcm16
+
 class EchoShieldDebug:
     def __init__(self):
         # Audio settings
@@ -22,19 +26,39 @@ class EchoShieldDebug:
         
         # Voice isolation
         self.vad = webrtcvad.Vad(3)
-        self.voice_encoder = VoiceEncoder()
+        self._vad_scratch_i = np.empty(self.frame_size, dtype=np.int16)
+        self._samples_30ms = int(self.sample_rate * 0.03)
         self.user_voice_embedding = None
         self.voice_similarity_threshold = 0.5
+        self.energy_threshold = 0.005
+        self._energy2_threshold = self.energy_threshold ** 2 * 2.5
+        
+        # Debug output is rate-limited; printing on every frame stalls the audio callback
+        self.status_interval = 0.2
+        self._last_print = 0.0
         
-        # Audio buffer
-        self.audio_buffer = []
+        # Audio buffer (last 2 seconds)
+        self.audio_buffer = RingBuffer(self.sample_rate * 2)
         
+    @property
+    def voice_encoder(self):
+        """The process-wide encoder from get_encoder(), only loaded once a voice sample needs it"""
+        return get_encoder()
+    
+    def print_status(self, message):
+        """Print at most once per status_interval"""
+        now = time.monotonic()
+        if now - self._last_print >= self.status_interval:
+            self._last_print = now
+            print(message)
+    
     def load_user_voice(self, voice_file_path):
         """Load user voice sample"""
         try:
             if os.path.exists(voice_file_path):
-                wav = preprocess_wav(voice_file_path)
-                self.user_voice_embedding = self.voice_encoder.embed_utterance(wav)
+                emb = load_voice_embedding(voice_file_path)
+                emb = emb / (np.linalg.norm(emb) + 1e-9)
+                self.user_voice_embedding = np.ascontiguousarray(emb, dtype=np.float32)
                 print(f"✅ Voice sample loaded: {voice_file_path}")
                 return True
             else:
@@ -45,25 +69,21 @@ class EchoShieldDebug:
             return False
     
     def is_speech(self, audio):
-        """Check if audio contains speech"""
+        """Run VAD on exactly one 30 ms frame"""
+        assert len(audio) == self.frame_size
         try:
-            audio_energy = np.mean(np.abs(audio))
-            if audio_energy < 0.005:
-                return False
-            
-            frame_length_ms = len(audio) * 1000 / self.sample_rate
-            if frame_length_ms > 30:
-                samples_30ms = int(self.sample_rate * 0.03)
-                audio = audio[-samples_30ms:]
-            
-            int16_audio = (audio * 32767).astype(np.int16).tobytes()
-            if len(int16_audio) < 320:
-                return False
-            
-            return self.vad.is_speech(int16_audio, self.sample_rate)
+            energy_and_pcm16(audio, self._vad_scratch_i)
+            return self.vad.is_speech(self._vad_scratch_i.tobytes(), self.sample_rate)
         except:
             return False
     
+    def is_speech_long(self, audio):
+        """Check a multi-frame chunk: energy over all of it, VAD on the last 30 ms"""
+        if float(audio @ audio) < self._energy2_threshold * audio.size:
+            return False
+        
+        return self.is_speech(audio[-self._samples_30ms:])
+    
     def is_user_voice(self, audio):
         """Check if audio matches user's voice with debug info"""
         if self.user_voice_embedding is None:
@@ -75,42 +95,44 @@ class EchoShieldDebug:
             
             wav = preprocess_wav(audio)
             current_embedding = self.voice_encoder.embed_utterance(wav)
-            similarity = np.dot(self.user_voice_embedding, current_embedding)
+            current_embedding /= np.linalg.norm(current_embedding) + 1e-9
+            similarity = float(self.user_voice_embedding @ current_embedding)
             
             return similarity > self.voice_similarity_threshold, similarity
         except Exception as e:
             return True, 0.0
     
-    def audio_callback(self, indata, outdata, frames, time, status):
+    def audio_callback(self, indata, outdata, frames, time_info, status):
         """Debug audio callback"""
         if status and 'overflow' not in str(status).lower():
             print(f"Status: {status}")
         
-        audio = indata[:, 0]  # mono
+        audio = np.frombuffer(indata, dtype=np.float32)
+        out = np.frombuffer(outdata, dtype=np.float32)
         
         # Add to buffer
-        self.audio_buffer.extend(audio.tolist())
+        self.audio_buffer.write(audio)
         
         # Process when buffer is full (2 seconds)
         if len(self.audio_buffer) >= self.sample_rate * 2:
-            audio_chunk = np.array(self.audio_buffer[-self.sample_rate * 2:])
+            audio_chunk = self.audio_buffer.latest()
             
-            is_speaking = self.is_speech(audio_chunk)
+            is_speaking = self.is_speech_long(audio_chunk)
             
             if is_speaking:
                 is_user, similarity = self.is_user_voice(audio_chunk)
                 
                 if is_user:
-                    outdata[:] = indata  # Pass through
-                    print(f"✅ YOUR VOICE: {similarity:.3f} (threshold: {self.voice_similarity_threshold:.3f})")
+                    np.copyto(out, audio)  # Pass through
+                    self.print_status(f"✅ YOUR VOICE: {similarity:.3f} (threshold: {self.voice_similarity_threshold:.3f})")
                 else:
-                    outdata[:] = np.zeros_like(indata)  # Block
-                    print(f"❌ OTHER VOICE: {similarity:.3f} (threshold: {self.voice_similarity_threshold:.3f})")
+                    out.fill(0.0)  # Block
+                    self.print_status(f"❌ OTHER VOICE: {similarity:.3f} (threshold: {self.voice_similarity_threshold:.3f})")
             else:
-                outdata[:] = np.zeros_like(indata)  # Block silence
-                print("🔇 SILENCE")
+                out.fill(0.0)  # Block silence
+                self.print_status("🔇 SILENCE")
         else:
-            outdata[:] = np.zeros_like(indata)
+            out.fill(0.0)
     
     def run_debug(self, voice_file_path):
         """Run debug mode"""
@@ -130,7 +152,7 @@ class EchoShieldDebug:
         print("=" * 50)
         
         try:
-            with sd.Stream(
+            with sd.RawStream(
                 samplerate=self.sample_rate,
                 blocksize=self.frame_size,
                 dtype='float32',
@@ -16,13 +16,21 @@ class GalaxyBudsController:
         self.is_connected = False
         self.current_mode = "unknown"
         
+        # Cache the connection state so mode switches don't fork blueutil every time
+        self._conn_ts = 0.0
+        self._conn_ttl = 10.0  # seconds
+        
     def check_connection(self) -> bool:
         """Check if Galaxy Buds are connected"""
+        if time.monotonic() - self._conn_ts < self._conn_ttl:
+            return self.is_connected
+        
         try:
             # Use Blueutil on macOS to check Bluetooth devices
             result = subprocess.run(['blueutil', '--paired'], 
-                                  capture_output=True, text=True)
-            if self.device_name.lower() in result.stdout.lower():
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            self._conn_ts = time.monotonic()
+            if self.device_name.lower().encode() in result.stdout.lower():
                 self.is_connected = True
                 print(f"✅ {self.device_name} is connected")
                 return True
@@ -5,101 +5,29 @@ A personal AI project for voice filtering and wake word detection
 """
 
 import argparse
+import importlib.util
 import os
+import shutil
 import sys
 import threading
 import time
 from pathlib import Path
 
-from voice_filter.mic_stream import run_stream
-from wake_word.detector import initialize_wake_word_detection, add_audio_to_detector
-
 def create_voice_sample_script():
     """Create a script to record user's voice sample"""
-    script_content = '''#!/usr/bin/env python3
-"""
-Script to record your voice sample for EchoShield voice identification
-"""
-
-import sounddevice as sd
-import numpy as np
-import soundfile as sf
-from pathlib import Path
-
-SAMPLE_RATE = 16000
-DURATION = 5  # seconds
-
-def record_voice_sample():
-    print("🎤 EchoShield Voice Sample Recorder")
-    print("=" * 40)
-    print("This will record a 5-second sample of your voice.")
-    print("Speak naturally - this will be used to identify your voice.")
-    print("=" * 40)
-    
-    input("Press Enter when ready to start recording...")
-    
-    print("🔴 Recording... Speak now!")
-    
-    # Record audio
-    audio = sd.rec(int(DURATION * SAMPLE_RATE), 
-                   samplerate=SAMPLE_RATE, 
-                   channels=1, 
-                   dtype='int16')
-    sd.wait()  # Wait until recording is finished
-    
-    print("✅ Recording complete!")
-    
-    # Save the audio
-    output_path = "audio_samples/my_voice.wav"
-    os.makedirs("audio_samples", exist_ok=True)
-    
-    sf.write(output_path, audio, SAMPLE_RATE)
-    print(f"💾 Voice sample saved to: {output_path}")
-    
-    return output_path
-
-if __name__ == "__main__":
-    record_voice_sample()
-'''
-    
-    with open("record_voice_sample.py", "w") as f:
-        f.write(script_content)
+    # Copy the recorder that ships next to this file rather than embedding a duplicate of it
+    template = Path(__file__).resolve().parent / "record_voice_sample.py"
+    target = Path("record_voice_sample.py")
+    if not (target.exists() and target.resolve() == template):
+        shutil.copy(template, target)
     
     print("📝 Created 'record_voice_sample.py' - run this to record your voice sample")
 
 def check_dependencies():
     """Check if all required dependencies are installed"""
-    missing_deps = []
-    
-    try:
-        import sounddevice
-    except ImportError:
-        missing_deps.append("sounddevice")
-    
-    try:
-        import webrtcvad
-    except ImportError:
-        missing_deps.append("webrtcvad")
-    
-    try:
-        import resemblyzer
-    except ImportError:
-        missing_deps.append("resemblyzer")
-    
-    try:
-        import noisereduce
-    except ImportError:
-        missing_deps.append("noisereduce")
-    
-    try:
-        import vosk
-    except ImportError:
-        missing_deps.append("vosk")
-    
-    try:
-        import numpy
-    except ImportError:
-        missing_deps.append("numpy")
+    # find_spec only locates the package; importing torch/PortAudio just to check takes seconds
+    required = ["sounddevice", "webrtcvad", "resemblyzer", "noisereduce", "vosk", "numpy"]
+    missing_deps = [dep for dep in required if importlib.util.find_spec(dep) is None]
     
     if missing_deps:
         print("❌ Missing dependencies:")
@@ -148,10 +76,11 @@ def main():
             "my_voice.wav"
         ]
         
-        for path in default_paths:
-            if os.path.exists(path):
-                voice_sample_path = path
-                break
+        # Two directory reads instead of a stat per candidate
+        existing = {e.name for e in os.scandir('.')}
+        if 'audio_samples' in existing:
+            existing |= {f"audio_samples/{e.name}" for e in os.scandir('audio_samples')}
+        voice_sample_path = next((p for p in default_paths if p in existing), None)
     
     if voice_sample_path and not os.path.exists(voice_sample_path):
         print(f"❌ Voice sample file not found: {voice_sample_path}")
@@ -162,6 +91,7 @@ def main():
     wake_word_detector = None
     if not args.no_wake_word:
         print("🔍 Initializing wake word detection...")
+        from wake_word.detector import initialize_wake_word_detection
         wake_word_detector, ambient_trigger = initialize_wake_word_detection(
             model_path=args.vosk_model,
             wake_words=args.wake_words
@@ -178,6 +108,9 @@ def main():
     print("Press Ctrl+C to stop")
     print("=" * 60)
     
+    # Deferred so --help and --create-voice-sample don't pay for numpy/torch/PortAudio
+    from voice_filter.mic_stream import run_stream
+    
     try:
         run_stream(
             voice_sample_path=voice_sample_path,
@@ -21,22 +21,18 @@ def record_voice_sample():
     
     input("Press Enter when ready to start recording...")
     
+    output_path = "audio_samples/my_voice.wav"
+    os.makedirs("audio_samples", exist_ok=True)
+    
     print("🔴 Recording... Speak now!")
     
-    # Record audio
-    audio = sd.rec(int(DURATION * SAMPLE_RATE), 
-                   samplerate=SAMPLE_RATE, 
-                   channels=1, 
-                   dtype='int16')
-    sd.wait()  # Wait until recording is finished
+    # Frames go straight from the input callback into the file; no full-length buffer
+    with sf.SoundFile(output_path, 'w', SAMPLE_RATE, 1, 'PCM_16') as f, \
+            sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype='int16',
+                           callback=lambda indata, *args: f.buffer_write(indata, dtype='int16')):
+        sd.sleep(int(DURATION * 1000))  # Wait until recording is finished
     
     print("✅ Recording complete!")
-    
-    # Save the audio
-    output_path = "audio_samples/my_voice.wav"
-    os.makedirs("audio_samples", exist_ok=True)
-    
-    sf.write(output_path, audio, SAMPLE_RATE)
     print(f"💾 Voice sample saved to: {output_path}")
     
     return output_path
@@ -4,65 +4,84 @@ EchoShield Simple Runner
 A lightweight version with minimal processing for testing
 """
 
-import sounddevice as sd
+import argparse
+import collections
 import numpy as np
 import webrtcvad
 import time
 
+from voice_filter.kernels import mean_abs_i16
+from utils.audio_tools import LowLatencyStream
+
 # Simple configuration
 SAMPLE_RATE = 16000
-FRAME_DURATION_MS = 30  # WebRTC VAD compatible frame size
+FRAME_DURATION_MS = 20  # WebRTC VAD supports 10/20/30 ms frames
 FRAME_SIZE = int(SAMPLE_RATE * FRAME_DURATION_MS / 1000)
 
-# Initialize VAD with higher aggressiveness
-vad = webrtcvad.Vad(3)  # High aggressiveness (0-3, 3 is most strict)
+# Initialize VAD; aggressiveness 3 clips too much real speech
+vad = webrtcvad.Vad(2)  # Moderate aggressiveness (0-3, 3 is most strict)
+
+# The stream delivers int16 already; 328 ~ 0.01 full scale
+ENERGY_THRESHOLD_I16 = 328
 
-def is_speech(audio, sample_rate):
+def is_speech(audio_i16, sample_rate):
     """Simple speech detection with volume threshold"""
-    try:
-        # Check audio volume first (simple energy-based detection)
-        audio_energy = np.mean(np.abs(audio))
-        if audio_energy < 0.01:  # Very quiet, probably not speech
-            return False
-        
-        # Ensure audio is the right length for WebRTC VAD
-        frame_length_ms = len(audio) * 1000 / sample_rate
-        
-        # If frame is too long, take the last 30ms
-        if frame_length_ms > 30:
-            samples_30ms = int(sample_rate * 0.03)  # 30ms in samples
-            audio = audio[-samples_30ms:]
-        
-        # Convert float32 [-1, 1] to int16
-        int16_audio = (audio * 32767).astype(np.int16).tobytes()
-        
-        # Check if we have enough data
-        if len(int16_audio) < 320:  # Minimum 20ms at 16kHz
-            return False
-            
-        return vad.is_speech(int16_audio, sample_rate)
-    except Exception as e:
-        print(f"VAD error: {e}")
+    # feed_vad always hands over exactly one VAD frame, so no length handling here
+    assert len(audio_i16) == FRAME_SIZE
+    
+    # Check audio volume first (simple energy-based detection)
+    if mean_abs_i16(audio_i16) < ENERGY_THRESHOLD_I16:  # Very quiet, probably not speech
         return False
+    
+    # Already PCM16, so no conversion is needed for WebRTC VAD
+    return vad.is_speech(audio_i16.tobytes(), sample_rate)
+
+# Written by the audio callback, read by the main loop for display
+_state = {'speech': False, 'vad_fill': 0}
+
+# PortAudio picks its native block size, so repack into VAD frames
+_vad_buf = np.empty(FRAME_SIZE, dtype=np.int16)
 
-def simple_audio_callback(indata, outdata, frames, time, status):
+# Majority vote over the last 3 VAD frames, so single-frame flips don't chop the audio
+_vad_votes = collections.deque([False] * 3, maxlen=3)
+
+def feed_vad(audio):
+    """Accumulate samples and update the speech decision for every full VAD frame"""
+    fill = _state['vad_fill']
+    pos = 0
+    while pos < len(audio):
+        take = min(FRAME_SIZE - fill, len(audio) - pos)
+        _vad_buf[fill:fill + take] = audio[pos:pos + take]
+        fill += take
+        pos += take
+        
+        if fill == FRAME_SIZE:
+            _vad_votes.append(is_speech(_vad_buf, SAMPLE_RATE))
+            _state['speech'] = sum(_vad_votes) >= 2
+            fill = 0
+    _state['vad_fill'] = fill
+    return _state['speech']
+
+def simple_audio_callback(indata, outdata, frames):
     """Simplified audio callback"""
-    if status and 'overflow' not in str(status).lower():
-        print(f"Status: {status}")
-    
-    audio = indata[:, 0]  # mono
+    audio = indata[:, 0]  # mono int16 view, no copy
     
-    # Simple speech detection
-    is_speaking = is_speech(audio, SAMPLE_RATE)
+    # Simple speech detection (majority of the latest VAD frames)
+    is_speaking = feed_vad(audio)
     
     if is_speaking:
         outdata[:] = indata  # Pass through speech
-        print("🎤 SPEECH DETECTED", end='\r')  # Show feedback
     else:
-        outdata[:] = np.zeros_like(indata)  # Mute silence
-        print("🔇 Listening...", end='\r')  # Show feedback
+        np.right_shift(indata, 4, out=outdata)  # Attenuate ~24 dB rather than hard-mute, avoids clicks
 
 def main():
+    parser = argparse.ArgumentParser(description="EchoShield Simple Mode")
+    parser.add_argument("--blocksize", type=int, default=0,
+                       help="Stream block size in samples (0 = PortAudio's native size)")
+    parser.add_argument("--exclusive", action="store_true",
+                       help="Use WASAPI exclusive mode (Windows only)")
+    args = parser.parse_args()
+    
     print("🛡️  EchoShield Simple Mode")
     print("=" * 40)
     print("This is a lightweight version for testing.")
@@ -71,18 +90,22 @@ def main():
     print("=" * 40)
     
     try:
-        with sd.Stream(
-            samplerate=SAMPLE_RATE,
-            blocksize=FRAME_SIZE,
-            dtype='int16',
-            channels=1,
-            callback=simple_audio_callback
-        ):
+        with LowLatencyStream(simple_audio_callback, samplerate=SAMPLE_RATE,
+                              blocksize=args.blocksize, exclusive=args.exclusive) as stream:
             print("🎤 Listening... Speak into the mic.")
             print("You should see 'SPEECH DETECTED' when you talk.")
             print("Press Ctrl+C to stop.")
             
+            # Feedback is printed here at 10 Hz, never from the audio thread
             while True:
+                status = stream.pop_status()
+                if status and 'overflow' not in str(status).lower():
+                    print(f"Status: {status}")
+                
+                if _state['speech']:
+                    print("🎤 SPEECH DETECTED", end='\r')
+                else:
+                    print("🔇 Listening...    ", end='\r')
                 time.sleep(0.1)
                 
     except KeyboardInterrupt:
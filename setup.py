@@ -7,6 +7,7 @@ Helps with initial configuration and setup
 import os
 import sys
 import subprocess
+import tempfile
 import urllib.request
 import zipfile
 from pathlib import Path
@@ -25,15 +26,29 @@ def download_vosk_model():
     print("   This may take a few minutes...")
     
     try:
-        urllib.request.urlretrieve(model_url, f"{model_name}.zip")
-        print("✅ Download complete!")
-        
-        print("📦 Extracting model...")
-        with zipfile.ZipFile(f"{model_name}.zip", 'r') as zip_ref:
-            zip_ref.extractall()
-        
-        # Clean up zip file
-        os.remove(f"{model_name}.zip")
+        # Stream into a spooled temp file (RAM up to 64 MB) instead of writing the zip to disk
+        chunk_size = 1 << 20
+        with urllib.request.urlopen(model_url) as response, \
+                tempfile.SpooledTemporaryFile(max_size=64 << 20) as tmp:
+            total = int(response.headers.get("Content-Length") or 0)
+            downloaded = 0
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                tmp.write(chunk)
+                downloaded += len(chunk)
+                if total:
+                    print(f"   {downloaded >> 20} / {total >> 20} MB", end='\r')
+                else:
+                    print(f"   {downloaded >> 20} MB", end='\r')
+            print()
+            print("✅ Download complete!")
+            
+            print("📦 Extracting model...")
+            tmp.seek(0)
+            with zipfile.ZipFile(tmp, 'r') as zip_ref:
+                zip_ref.extractall()
         
         print(f"✅ Vosk model ready: {model_name}")
         return model_name
@@ -3,21 +3,19 @@
 Simple Audio Test - Just test if microphone and speakers work
 """
 
-import sounddevice as sd
-import numpy as np
 import time
 
+from utils.audio_tools import LowLatencyStream
+
 SAMPLE_RATE = 16000
-FRAME_SIZE = 480  # 30ms at 16kHz
 
-def test_callback(indata, outdata, frames, time, status):
+_state = {'frames': 0}
+
+def test_callback(indata, outdata, frames):
     """Simple passthrough - just copy input to output"""
-    if status:
-        print(f"Status: {status}")
-    
     # Just pass audio through (no processing)
     outdata[:] = indata
-    print("🎤 Audio flowing...", end='\r')
+    _state['frames'] += 1
 
 def main():
     print("🔊 EchoShield Audio Test")
@@ -28,17 +26,17 @@ def main():
     print("=" * 30)
     
     try:
-        with sd.Stream(
-            samplerate=SAMPLE_RATE,
-            blocksize=FRAME_SIZE,
-            dtype='float32',
-            channels=1,
-            callback=test_callback
-        ):
+        with LowLatencyStream(test_callback, samplerate=SAMPLE_RATE) as stream:
             print("🎤 Speak into your microphone...")
             print("You should hear yourself in your headphones/speakers.")
             
             while True:
+                status = stream.pop_status()
+                if status:
+                    print(f"Status: {status}")
+                
+                if _state['frames']:
+                    print("🎤 Audio flowing...", end='\r')
                 time.sleep(0.1)
                 
     except KeyboardInterrupt:
@@ -23,21 +23,24 @@ def test_import(module_name, package_name=None):
 def test_audio_devices():
     """Test audio device availability"""
     try:
+        # Always enumerate live: this is a diagnostic, and test_import already loaded PortAudio
         import sounddevice as sd
         devices = sd.query_devices()
         print(f"✅ Audio devices: {len(devices)} found")
         
-        # Check for input devices
-        input_devices = [d for d in devices if d['max_input_channels'] > 0]
+        # Count input and output devices in one pass
+        input_devices = output_devices = 0
+        for d in devices:
+            input_devices += d['max_input_channels'] > 0
+            output_devices += d['max_output_channels'] > 0
+        
         if input_devices:
-            print(f"   📱 Input devices: {len(input_devices)} available")
+            print(f"   📱 Input devices: {input_devices} available")
         else:
             print("   ⚠️  No input devices found")
             
-        # Check for output devices
-        output_devices = [d for d in devices if d['max_output_channels'] > 0]
         if output_devices:
-            print(f"   🔊 Output devices: {len(output_devices)} available")
+            print(f"   🔊 Output devices: {output_devices} available")
         else:
             print("   ⚠️  No output devices found")
             
@@ -60,12 +63,14 @@ def test_vosk_model():
             "models/vosk-model-en-us-0.22"
         ]
         
-        model_found = False
-        for path in model_paths:
-            if os.path.exists(path):
-                print(f"✅ Vosk model: Found at {path}")
-                model_found = True
-                break
+        existing = {e.name for e in os.scandir('.')}
+        if 'models' in existing:
+            existing |= {f"models/{e.name}" for e in os.scandir('models')}
+        
+        found = next((p for p in model_paths if p in existing), None)
+        model_found = found is not None
+        if model_found:
+            print(f"✅ Vosk model: Found at {found}")
         
         if not model_found:
             print("⚠️  Vosk model: Not found (wake word detection will be disabled)")
@@ -4,19 +4,23 @@ Normal Recording Test - Records audio without EchoShield processing
 Use this to compare with EchoShield output
 """
 
-import sounddevice as sd
-import numpy as np
 import time
 import os
+import queue
+import threading
 from datetime import datetime
 import soundfile as sf
 
+from utils.audio_tools import LowLatencyStream
+
 class NormalRecorder:
     def __init__(self):
         self.sample_rate = 16000
         self.frame_size = 480  # 30ms at 16kHz
         self.is_recording = False
-        self.audio_buffer = []
+        self._sf = None
+        self._q = None
+        self._writer = None
         
     def start_recording(self, filename_prefix="normal_recording"):
         """Start normal recording"""
@@ -25,12 +29,26 @@ class NormalRecorder:
         
         os.makedirs("recordings", exist_ok=True)
         
+        # Frames are streamed to disk by a writer thread while recording, not saved at stop
+        self._sf = sf.SoundFile(self.filename, mode='w', samplerate=self.sample_rate,
+                                channels=1, subtype='PCM_16')
+        self._q = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_frames, daemon=True)
+        self._writer.start()
+        
         self.is_recording = True
-        self.audio_buffer = []
         
         print(f"🎤 Normal recording started: {self.filename}")
         return True
     
+    def _write_frames(self):
+        """Writer thread: append queued blocks to the WAV file"""
+        while True:
+            frame = self._q.get()
+            if frame is None:
+                break
+            self._sf.write(frame)
+    
     def stop_recording(self):
         """Stop and save recording"""
         if not self.is_recording:
@@ -38,26 +56,21 @@ class NormalRecorder:
         
         self.is_recording = False
         
-        if self.audio_buffer:
-            audio_data = np.concatenate(self.audio_buffer)
-            sf.write(self.filename, audio_data, self.sample_rate)
-            print(f"💾 Normal recording saved: {self.filename}")
+        self._q.put(None)
+        self._writer.join()
+        self._sf.close()
+        print(f"💾 Normal recording saved: {self.filename}")
         
         return True
     
-    def audio_callback(self, indata, outdata, frames, time, status):
+    def audio_callback(self, indata, outdata, frames):
         """Simple passthrough callback"""
-        if status:
-            print(f"Status: {status}")
-        
         # Just pass audio through (no processing)
         outdata[:] = indata
         
         # Record audio
         if self.is_recording:
-            self.audio_buffer.append(indata.copy())
-        
-        print("🎤 Normal recording...", end='\r')
+            self._q.put(indata.copy())
     
     def run(self, duration=10):
         """Run normal recording for specified duration"""
@@ -71,18 +84,18 @@ class NormalRecorder:
         self.start_recording("normal_test")
         
         try:
-            with sd.Stream(
-                samplerate=self.sample_rate,
-                blocksize=self.frame_size,
-                dtype='float32',
-                channels=1,
-                callback=self.audio_callback
-            ):
+            with LowLatencyStream(self.audio_callback, samplerate=self.sample_rate) as stream:
                 print(f"🎤 Recording for {duration} seconds...")
                 print("Speak normally - this will record everything")
                 print("Press Ctrl+C to stop early")
                 
-                time.sleep(duration)
+                end_time = time.monotonic() + duration
+                while time.monotonic() < end_time:
+                    status = stream.pop_status()
+                    if status:
+                        print(f"Status: {status}")
+                    print("🎤 Normal recording...", end='\r')
+                    time.sleep(0.1)
                 
         except KeyboardInterrupt:
             print("\n🛑 Recording stopped by user")
@@ -94,8 +107,6 @@ class NormalRecorder:
 
 def main():
     """Main function"""
-    recorder = NormalRecorder()
-    
     print("Choose recording duration:")
     print("1. 10 seconds")
     print("2. 30 seconds")
@@ -116,6 +127,7 @@ def main():
         else:
             duration = 10
         
+        recorder = NormalRecorder()
         recorder.run(duration)
         
     except KeyboardInterrupt:
@@ -0,0 +1,55 @@
+import sys
+
+class LowLatencyStream:
+    """Duplex sounddevice stream shared by the simple scripts
+
+    on_frame(indata, outdata, frames) runs on the audio thread: it must not print or allocate.
+    Callback status flags are kept for the main loop to report via pop_status().
+    """
+
+    def __init__(self, on_frame, samplerate=16000, blocksize=0, dtype='int16',
+                 latency='low', channels=1, exclusive=False):
+        self.on_frame = on_frame
+        self.samplerate = samplerate
+        self.blocksize = blocksize  # 0 lets PortAudio use its native block size
+        self.dtype = dtype
+        self.latency = latency
+        self.channels = channels
+        self.exclusive = exclusive  # WASAPI exclusive mode, Windows only
+        self.status = None
+        self._stream = None
+
+    def _callback(self, indata, outdata, frames, time_info, status):
+        if status:
+            self.status = status
+        self.on_frame(indata, outdata, frames)
+
+    def pop_status(self):
+        """Return and clear the last non-empty callback status"""
+        status, self.status = self.status, None
+        return status
+
+    def __enter__(self):
+        import sounddevice as sd
+
+        extra_settings = None
+        if self.exclusive and sys.platform == "win32":
+            extra_settings = sd.WasapiSettings(exclusive=True)
+
+        self._stream = sd.Stream(
+            samplerate=self.samplerate,
+            blocksize=self.blocksize,
+            latency=self.latency,
+            dtype=self.dtype,
+            channels=self.channels,
+            extra_settings=extra_settings,
+            callback=self._callback
+        )
+        self._stream.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stream.stop()
+        self._stream.close()
+        self._stream = None
+        return False
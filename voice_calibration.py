@@ -6,24 +6,29 @@ Helps you find the right voice similarity threshold
 
 import sounddevice as sd
 import numpy as np
-import time
 import os
-from resemblyzer import VoiceEncoder, preprocess_wav
+import queue
+from resemblyzer import preprocess_wav
+
+from voice_filter.encoder import get_encoder, load_voice_embedding, load_voice_wav
+from voice_filter.ring_buffer import RingBuffer
+from voice_filter.similarity import similarity
 
 class VoiceCalibration:
     def __init__(self):
         self.sample_rate = 16000
         self.frame_size = 480  # 30ms
-        self.voice_encoder = VoiceEncoder()
+        self.voice_encoder = get_encoder()
         self.user_voice_embedding = None
-        self.audio_buffer = []
+        self.audio_buffer = RingBuffer(self.sample_rate * 4)
+        self.samples_since_scored = 0
+        self.score_q = queue.Queue(maxsize=1)  # Windows waiting to be scored by run_calibration
         
     def load_user_voice(self, voice_file_path):
         """Load user voice sample"""
         try:
             if os.path.exists(voice_file_path):
-                wav = preprocess_wav(voice_file_path)
-                self.user_voice_embedding = self.voice_encoder.embed_utterance(wav)
+                self.user_voice_embedding = load_voice_embedding(voice_file_path)
                 print(f"✅ Voice sample loaded: {voice_file_path}")
                 return True
             else:
@@ -40,33 +45,43 @@ class VoiceCalibration:
         
         audio = indata[:, 0]  # mono
         
-        # Add to buffer
-        self.audio_buffer.extend(audio.tolist())
+        # Add to buffer (slice copy into the ring, no Python floats)
+        self.audio_buffer.write(audio)
+        self.samples_since_scored += len(audio)
         
-        # Process when buffer is full (2 seconds)
-        if len(self.audio_buffer) >= self.sample_rate * 2:
-            audio_chunk = np.array(self.audio_buffer[-self.sample_rate * 2:])
-            
-            if self.user_voice_embedding is not None:
-                try:
-                    wav = preprocess_wav(audio_chunk)
-                    current_embedding = self.voice_encoder.embed_utterance(wav)
-                    similarity = np.dot(self.user_voice_embedding, current_embedding)
-                    
-                    print(f"🎯 Voice similarity: {similarity:.3f}", end='\r')
-                    
-                    if similarity > 0.6:
-                        print(f"✅ YOUR VOICE detected (similarity: {similarity:.3f})")
-                    elif similarity > 0.4:
-                        print(f"⚠️  UNCERTAIN (similarity: {similarity:.3f})")
-                    else:
-                        print(f"❌ OTHER VOICE detected (similarity: {similarity:.3f})")
-                        
-                except Exception as e:
-                    print(f"Error: {e}")
+        # Hand the latest 2 seconds to the main loop once every 2 seconds of new audio;
+        # embedding takes far longer than one low-latency block, so it never runs here
+        if self.samples_since_scored >= self.sample_rate * 2:
+            self.samples_since_scored = 0
+            try:
+                self.score_q.put_nowait(self.audio_buffer.latest(self.sample_rate * 2))
+            except queue.Full:
+                pass  # Previous window is still being scored
+        
+        # Pass audio through (both buffers are (N, 1) float32, so this is a straight copy)
+        np.copyto(outdata, indata)
+    
+    def score_chunk(self, audio_chunk):
+        """Embed a window, compare it to the user's voice and print the verdict"""
+        if self.user_voice_embedding is None:
+            return
         
-        # Pass audio through
-        outdata[:] = indata
+        try:
+            wav = preprocess_wav(audio_chunk)
+            current_embedding = self.voice_encoder.embed_utterance(wav)
+            score = similarity(self.user_voice_embedding, current_embedding)
+            
+            print(f"🎯 Voice similarity: {score:.3f}", end='\r')
+            
+            if score > 0.6:
+                print(f"✅ YOUR VOICE detected (similarity: {score:.3f})")
+            elif score > 0.4:
+                print(f"⚠️  UNCERTAIN (similarity: {score:.3f})")
+            else:
+                print(f"❌ OTHER VOICE detected (similarity: {score:.3f})")
+                
+        except Exception as e:
+            print(f"Error: {e}")
     
     def run_calibration(self, voice_file_path):
         """Run voice calibration"""
@@ -86,17 +101,23 @@ class VoiceCalibration:
         print("=" * 50)
         
         try:
+            # The ring buffer takes any block size, so let PortAudio pick its native one
             with sd.Stream(
                 samplerate=self.sample_rate,
-                blocksize=self.frame_size,
+                blocksize=0,
                 dtype='float32',
                 channels=1,
+                latency='low',
                 callback=self.audio_callback
             ):
                 print("🎤 Listening for calibration...")
                 
+                # Scoring runs here, off the audio thread
                 while True:
-                    time.sleep(0.1)
+                    try:
+                        self.score_chunk(self.score_q.get(timeout=0.1))
+                    except queue.Empty:
+                        pass
                     
         except KeyboardInterrupt:
             print("\n🛑 Calibration stopped")
@@ -112,23 +133,22 @@ class VoiceCalibration:
         
         try:
             # Load the voice sample multiple times to test consistency
-            wav = preprocess_wav(voice_file_path)
+            wav = load_voice_wav(voice_file_path)  # Same cached WAV load_user_voice used
             
             # Split into chunks and test similarity
             chunk_size = self.sample_rate * 1  # 1 second chunks
-            similarities = []
+            starts = range(0, len(wav) - chunk_size, chunk_size // 2)
             
-            for i in range(0, len(wav) - chunk_size, chunk_size // 2):
-                chunk = wav[i:i + chunk_size]
-                if len(chunk) >= chunk_size:
-                    chunk_embedding = self.voice_encoder.embed_utterance(chunk)
-                    similarity = np.dot(self.user_voice_embedding, chunk_embedding)
-                    similarities.append(similarity)
+            # Embeddings go into one preallocated matrix, scored with a single matrix-vector product
+            embeddings = np.empty((len(starts), self.user_voice_embedding.shape[0]), dtype=np.float32)
+            for row, i in enumerate(starts):
+                embeddings[row] = self.voice_encoder.embed_utterance(wav[i:i + chunk_size])
+            similarities = embeddings @ self.user_voice_embedding
             
-            if similarities:
-                avg_similarity = np.mean(similarities)
-                min_similarity = np.min(similarities)
-                max_similarity = np.max(similarities)
+            if similarities.size:
+                avg_similarity = similarities.mean()
+                min_similarity = similarities.min()
+                max_similarity = similarities.max()
                 
                 print(f"📊 Voice Analysis Results:")
                 print(f"   Average similarity: {avg_similarity:.3f}")
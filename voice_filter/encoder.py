@@ -0,0 +1,75 @@
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+_encoder = None
+_lock = threading.Lock()
+
+def _load_onnx_encoder():
+    """Return the INT8 ONNX encoder if it has been exported and onnxruntime is installed"""
+    from voice_filter.onnx_encoder import ONNX_MODEL_INT8, FastEncoder
+
+    if not os.path.exists(ONNX_MODEL_INT8):
+        return None
+    try:
+        return FastEncoder(ONNX_MODEL_INT8)
+    except Exception as e:
+        print(f"⚠️  ONNX voice encoder unavailable, using Resemblyzer: {e}")
+        return None
+
+def get_encoder(device=None):
+    """Return the process-wide voice encoder, loading it on first use
+
+    Uses the INT8 ONNX export (python -m voice_filter.onnx_encoder) when present, otherwise
+    Resemblyzer's VoiceEncoder; with device=None it picks CUDA when available, otherwise CPU.
+    """
+    global _encoder
+    with _lock:
+        if _encoder is None:
+            # Both encoders look the mel front-end up on resemblyzer.audio, so patch it first
+            from voice_filter import mel
+            mel.install()
+
+            _encoder = _load_onnx_encoder()
+            if _encoder is None:
+                from resemblyzer import VoiceEncoder
+                _encoder = VoiceEncoder(device=device)
+
+            # One throwaway embedding allocates the runtime's workspace before real audio arrives
+            try:
+                _encoder.embed_utterance(np.zeros(16000, dtype=np.float32))
+            except Exception:
+                pass
+    return _encoder
+
+def encoder_id():
+    """Short tag naming the loaded encoder; embeddings from different encoders don't compare"""
+    from voice_filter.onnx_encoder import FastEncoder
+
+    return "onnx-int8" if isinstance(get_encoder(), FastEncoder) else "resemblyzer"
+
+@lru_cache(maxsize=8)
+def _load_voice_wav(path, mtime):
+    from resemblyzer import preprocess_wav
+
+    wav = preprocess_wav(path)
+    wav.setflags(write=False)  # Shared by every caller, so nobody may modify it
+    return wav
+
+@lru_cache(maxsize=8)
+def _load_voice_embedding(path, mtime):
+    emb = np.ascontiguousarray(get_encoder().embed_utterance(_load_voice_wav(path, mtime)), dtype=np.float32)
+    emb.setflags(write=False)
+    return emb
+
+def load_voice_wav(path):
+    """Return preprocess_wav(path), cached until the file's mtime changes (read-only)"""
+    path = os.path.abspath(path)
+    return _load_voice_wav(path, os.path.getmtime(path))
+
+def load_voice_embedding(path):
+    """Return the float32 embedding of a voice sample, cached like load_voice_wav (read-only)"""
+    path = os.path.abspath(path)
+    return _load_voice_embedding(path, os.path.getmtime(path))
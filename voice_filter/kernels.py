@@ -0,0 +1,89 @@
+import numpy as np
+
+# Numba is optional: without it the kernels fall back to plain NumPy
+try:
+    from numba import njit, types
+except ImportError:
+    njit = None
+
+def _energy_and_pcm16(audio, out_i16):
+    """Return sum(x^2) of a float32 frame and write its PCM16 conversion into out_i16"""
+    s = 0.0
+    for i in range(audio.shape[0]):
+        v = audio[i]
+        s += v * v
+        x = v * 32767.0
+        if x > 32767.0:
+            x = 32767.0
+        elif x < -32768.0:
+            x = -32768.0
+        out_i16[i] = np.int16(x)
+    return s
+
+def _energy_and_pcm16_numpy(audio, out_i16):
+    """NumPy fallback for energy_and_pcm16"""
+    out_i16[:] = np.clip(audio * np.float32(32767.0), -32768.0, 32767.0)
+    return float(audio @ audio)
+
+def _mean_abs_i16(audio):
+    """Return mean |x| of a PCM16 frame without temporaries (or int16 abs overflow)"""
+    n = audio.shape[0]
+    acc = 0
+    for i in range(n):
+        v = np.int32(audio[i])
+        acc += v if v >= 0 else -v
+    return acc / n
+
+def _mean_abs_i16_numpy(audio):
+    """NumPy fallback for mean_abs_i16"""
+    return float(np.abs(audio.astype(np.int32)).mean())
+
+def _normalize_inplace(x):
+    """Scale x in place so its peak magnitude is 1 (left as zeros if silent)"""
+    m = 0.0
+    for i in range(x.shape[0]):
+        a = abs(x[i])
+        if a > m:
+            m = a
+    s = 1.0 / m if m > 0.0 else 0.0
+    for i in range(x.shape[0]):
+        x[i] *= s
+
+def _normalize_inplace_numpy(x):
+    """NumPy fallback for normalize_inplace"""
+    m = np.max(np.abs(x)) if len(x) else 0.0
+    x *= (1.0 / m) if m > 0.0 else 0.0
+
+def _f32_to_i16(src, dst):
+    """Write the clipped PCM16 conversion of a float32 signal into dst"""
+    for i in range(src.shape[0]):
+        v = src[i] * 32767.0
+        if v > 32767.0:
+            v = 32767.0
+        elif v < -32768.0:
+            v = -32768.0
+        dst[i] = np.int16(v)
+
+def _f32_to_i16_numpy(src, dst):
+    """NumPy fallback for f32_to_i16"""
+    dst[:] = np.clip(src * np.float32(32767.0), -32768.0, 32767.0)
+
+# Explicit signatures compile at import (or load from cache), never on the audio thread.
+# Inputs are typed read-only so np.frombuffer views match as well as writable arrays.
+if njit is not None:
+    _f32_in = types.Array(types.float32, 1, 'A', readonly=True)
+    _i16_in = types.Array(types.int16, 1, 'A', readonly=True)
+    _i16_out = types.Array(types.int16, 1, 'A')
+    energy_and_pcm16 = njit(types.float64(_f32_in, _i16_out),
+                            cache=True, fastmath=True, boundscheck=False)(_energy_and_pcm16)
+    mean_abs_i16 = njit(types.float64(_i16_in),
+                        cache=True, fastmath=True, boundscheck=False)(_mean_abs_i16)
+    normalize_inplace = njit(types.void(types.Array(types.float32, 1, 'A')),
+                             cache=True, fastmath=True, boundscheck=False)(_normalize_inplace)
+    f32_to_i16 = njit(types.void(_f32_in, _i16_out),
+                      cache=True, fastmath=True, boundscheck=False)(_f32_to_i16)
+else:
+    energy_and_pcm16 = _energy_and_pcm16_numpy
+    mean_abs_i16 = _mean_abs_i16_numpy
+    normalize_inplace = _normalize_inplace_numpy
+    f32_to_i16 = _f32_to_i16_numpy
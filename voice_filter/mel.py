@@ -0,0 +1,34 @@
+from functools import lru_cache
+
+import numpy as np
+
+@lru_cache(maxsize=4)
+def mel_basis(sample_rate, n_fft, n_mels):
+    """Return librosa's mel filterbank, built once per (sample_rate, n_fft, n_mels)"""
+    import librosa
+
+    basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels)
+    basis.setflags(write=False)
+    return basis
+
+def wav_to_mel_spectrogram(wav):
+    """Drop-in for resemblyzer.audio.wav_to_mel_spectrogram with a cached filterbank
+
+    librosa.feature.melspectrogram rebuilds the filterbank on every call; this reuses it and
+    squares the STFT magnitude in place. Output is the same (frames, n_mels) float32 array.
+    """
+    import librosa
+    from resemblyzer.hparams import mel_n_channels, mel_window_length, mel_window_step, sampling_rate
+
+    n_fft = int(sampling_rate * mel_window_length / 1000)
+    hop_length = int(sampling_rate * mel_window_step / 1000)
+
+    power = np.abs(librosa.stft(wav, n_fft=n_fft, hop_length=hop_length))
+    np.square(power, out=power)
+    return (mel_basis(sampling_rate, n_fft, mel_n_channels) @ power).astype(np.float32, copy=False).T
+
+def install():
+    """Route Resemblyzer (and FastEncoder) through the cached front-end"""
+    from resemblyzer import audio
+
+    audio.wav_to_mel_spectrogram = wav_to_mel_spectrogram
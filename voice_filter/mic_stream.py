@@ -1,11 +1,13 @@
 import sounddevice as sd
 import numpy as np
-from scipy.signal import resample
-import noisereduce as nr
 import threading
+import queue
 import time
-from collections import deque
-from voice_filter.vad_filter import is_speech, is_user_voice, load_user_voice_embedding
+import os
+from voice_filter.ring_buffer import RingBuffer
+from voice_filter.silero_vad import SileroVAD
+from voice_filter.vad_filter import (VOICE_SIMILARITY_THRESHOLD, is_speech_int16,
+                                     load_user_voice_embedding, user_voice_similarity)
 from wake_word.detector import add_audio_to_detector
 
 SAMPLE_RATE = 16000  # Required for webrtcvad
@@ -14,59 +16,156 @@ FRAME_SIZE = int(SAMPLE_RATE * FRAME_DURATION_MS / 1000)
 
 # Audio buffer for voice identification (needs longer samples)
 AUDIO_BUFFER_SIZE = SAMPLE_RATE * 2  # 2 seconds buffer
-audio_buffer = deque(maxlen=AUDIO_BUFFER_SIZE)
+audio_buffer = RingBuffer(AUDIO_BUFFER_SIZE, dtype=np.int16)  # Stream is int16; stored as-is
 
 # Voice identification settings
 user_voice_embedding = None
 voice_identification_enabled = False
+voice_id_worker = None
+
+# Hand the worker a fresh window every ~500 ms of speech, and at once when the last decision
+# (or request) is older than DECISION_TTL, e.g. at the start of a new utterance
+SUBMIT_EVERY_FRAMES = int(0.5 * SAMPLE_RATE / FRAME_SIZE)
+DECISION_TTL = 2.0
+speech_frames = 0
+
+# Scores within this margin of the threshold keep the previous decision, so gating doesn't flicker
+SIMILARITY_HYSTERESIS = 0.05
+
+# Preallocated so muting a block is a plain buffer copy
+SILENCE = bytes(FRAME_SIZE * 2)
+
+# Silero VAD replaces WebRTC VAD when its model is present (see README)
+SILERO_MODEL_PATH = "silero_vad.onnx"
+silero_vad = None
+_vad_f32 = np.empty(FRAME_SIZE, dtype=np.float32)
+
+# Without Silero, WebRTC VAD runs on every other frame; speech state changes far slower than 60 ms
+VAD_EVERY_FRAMES = 2
+vad_frames = 0
+last_vad_decision = False
+
+class VoiceIDWorker(threading.Thread):
+    """Runs speaker embeddings off the audio thread and publishes the latest decision"""
+    
+    def __init__(self, user_embedding):
+        super().__init__(daemon=True)
+        self.user_embedding = user_embedding
+        self.queue = queue.Queue(maxsize=2)
+        self.is_user = threading.Event()
+        self.is_user.set()  # Allow speech through until the first decision
+        self.decided_at = time.monotonic()
+        self.submitted_at = self.decided_at
+    
+    def submit(self, chunk):
+        """Queue a window without blocking; drop it if the worker is behind"""
+        self.submitted_at = time.monotonic()
+        try:
+            self.queue.put_nowait(chunk)
+        except queue.Full:
+            pass
+    
+    def is_stale(self):
+        """True when neither a decision nor a request has happened within DECISION_TTL"""
+        return time.monotonic() - max(self.decided_at, self.submitted_at) >= DECISION_TTL
+    
+    def current(self):
+        """Latest decision; a stale one is kept (not muted) until a fresh window is scored"""
+        return self.is_user.is_set()
+    
+    def run(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            
+            try:
+                score = user_voice_similarity(chunk, SAMPLE_RATE, self.user_embedding)
+            except Exception as e:
+                print(f"Error in voice identification: {e}")
+                score = 1.0  # Same fallback as is_user_voice: let speech through
+            
+            if score is None:
+                self.is_user.clear()
+            elif self.is_user.is_set():
+                if score < VOICE_SIMILARITY_THRESHOLD - SIMILARITY_HYSTERESIS:
+                    self.is_user.clear()
+            elif score > VOICE_SIMILARITY_THRESHOLD + SIMILARITY_HYSTERESIS:
+                self.is_user.set()
+            self.decided_at = time.monotonic()
+    
+    def stop(self):
+        """Ask the worker to exit after the current window"""
+        try:
+            self.queue.put(None, timeout=1.0)
+        except queue.Full:
+            pass  # Daemon thread; it exits with the process
+
+def snapshot():
+    """Return the buffered audio as contiguous float32 in [-1, 1] for the embedder"""
+    return audio_buffer.latest().astype(np.float32) / 32768.0
+
+def detect_speech(audio, pcm):
+    """Speech decision for one frame (int16 view plus its raw bytes): Silero if loaded, else
+    WebRTC VAD with a cached result"""
+    global vad_frames, last_vad_decision
+    
+    if silero_vad is not None:
+        np.multiply(audio, 1.0 / 32768.0, out=_vad_f32)
+        return silero_vad.process(_vad_f32)
+    
+    if vad_frames % VAD_EVERY_FRAMES == 0:
+        last_vad_decision = is_speech_int16(pcm, SAMPLE_RATE)
+    vad_frames += 1
+    return last_vad_decision
 
 def audio_callback(indata, outdata, frames, time, status):
-    global audio_buffer, user_voice_embedding, voice_identification_enabled
+    global speech_frames
     
     # Only print status errors, not overflow warnings
     if status and 'overflow' not in str(status).lower():
         print(f"Status: {status}")
 
-    audio = indata[:, 0]  # mono
+    # RawStream hands over CFFI buffers. The one bytes copy (it must outlive the callback) is
+    # shared by WebRTC VAD and Vosk; NumPy only gets a zero-copy view of it for the ring buffer.
+    pcm = bytes(indata)
+    audio = np.frombuffer(pcm, dtype=np.int16)  # mono
     
     # Add to buffer for voice identification
-    audio_buffer.extend(audio)
+    audio_buffer.write(audio)
     
     # Send audio to wake word detector (runs in parallel)
-    add_audio_to_detector(audio)
+    add_audio_to_detector(pcm)
     
-    # Check if there's speech
-    is_speaking = is_speech(audio, SAMPLE_RATE)
+    # Check if there's speech (the stream is int16 with 30 ms blocks)
+    is_speaking = detect_speech(audio, pcm)
     
+    # Noise reduction is skipped to keep CPU load down, so speech passes through unmodified
+    # Check if it's the user's voice (if voice identification is enabled)
+    if is_speaking and voice_id_worker is not None:
+        # The worker embeds the full buffer; the callback only reads its last decision
+        speech_frames += 1
+        if speech_frames % SUBMIT_EVERY_FRAMES == 0 or voice_id_worker.is_stale():
+            voice_id_worker.submit(snapshot())
+        is_speaking = voice_id_worker.current()
+    
+    # indata and outdata are both raw mono int16 buffers, so gating is one buffer copy
     if is_speaking:
-        # Simplified processing to reduce CPU load
-        audio_processed = audio  # Skip noise reduction for now to reduce load
-        
-        # Check if it's the user's voice (if voice identification is enabled)
-        if voice_identification_enabled and user_voice_embedding is not None:
-            # Use the full buffer for better voice identification
-            buffer_array = np.array(audio_buffer)
-            is_user = is_user_voice(buffer_array, SAMPLE_RATE, user_voice_embedding)
-            
-            if is_user:
-                outdata[:] = audio_processed.reshape(-1, 1)  # Play back user's voice
-            else:
-                outdata[:] = np.zeros_like(indata)  # Mute other voices
-        else:
-            # If voice identification is disabled, play back all speech
-            outdata[:] = audio_processed.reshape(-1, 1)
+        outdata[:] = indata  # Play back (the user's) speech
     else:
-        outdata[:] = np.zeros_like(indata)  # Mute non-speech
+        outdata[:] = SILENCE  # Mute non-speech and other voices
 
 def setup_voice_identification(voice_sample_path=None):
     """Setup voice identification with user's voice sample"""
-    global user_voice_embedding, voice_identification_enabled
+    global user_voice_embedding, voice_identification_enabled, voice_id_worker
     
     if voice_sample_path:
         print(f"Loading voice sample from: {voice_sample_path}")
         user_voice_embedding = load_user_voice_embedding(voice_sample_path)
         if user_voice_embedding is not None:
             voice_identification_enabled = True
+            voice_id_worker = VoiceIDWorker(user_voice_embedding)
+            voice_id_worker.start()
             print("✅ Voice identification enabled")
         else:
             print("❌ Failed to load voice sample")
@@ -74,6 +173,17 @@ def setup_voice_identification(voice_sample_path=None):
         print("ℹ️  No voice sample provided - all speech will be allowed through")
         voice_identification_enabled = False
 
+def setup_vad():
+    """Load Silero VAD if its model is available, otherwise keep WebRTC VAD"""
+    global silero_vad
+    
+    if os.path.exists(SILERO_MODEL_PATH):
+        try:
+            silero_vad = SileroVAD(SILERO_MODEL_PATH)
+            print("✅ Silero VAD enabled")
+        except Exception as e:
+            print(f"⚠️  Silero VAD unavailable, using webrtcvad: {e}")
+
 def run_stream(voice_sample_path=None, enable_noise_reduction=True):
     """Run the audio stream with voice filtering"""
     global voice_identification_enabled
@@ -81,7 +191,8 @@ def run_stream(voice_sample_path=None, enable_noise_reduction=True):
     print("🎤 EchoShield - Real-time Voice Isolation")
     print("=" * 50)
     
-    # Setup voice identification
+    # Setup speech detection and voice identification
+    setup_vad()
     setup_voice_identification(voice_sample_path)
     
     if enable_noise_reduction:
@@ -93,11 +204,15 @@ def run_stream(voice_sample_path=None, enable_noise_reduction=True):
     print("=" * 50)
     
     try:
-        with sd.Stream(
+        # The VAD needs exact 30 ms frames, so the block size stays fixed; 'low' latency drops
+        # PortAudio's default ~30-45 ms buffering. The callback stays under one block's budget
+        # because speaker embedding runs on VoiceIDWorker, not here.
+        with sd.RawStream(
             samplerate=SAMPLE_RATE,
             blocksize=FRAME_SIZE,
             dtype='int16',
             channels=1,
+            latency='low',
             callback=audio_callback
         ):
             print("🎤 Listening... Speak into the mic.")
@@ -109,4 +224,7 @@ def run_stream(voice_sample_path=None, enable_noise_reduction=True):
     except KeyboardInterrupt:
         print("\n🛑 Stopping EchoShield...")
     except Exception as e:
-        print(f"❌ Error: {e}")
\ No newline at end of file
+        print(f"❌ Error: {e}")
+    finally:
+        if voice_id_worker is not None:
+            voice_id_worker.stop()
\ No newline at end of file
@@ -0,0 +1,50 @@
+import numpy as np
+
+ONNX_MODEL = "voice_encoder.onnx"
+ONNX_MODEL_INT8 = "voice_encoder_int8.onnx"
+
+def export_onnx(model_path=ONNX_MODEL, quantized_path=ONNX_MODEL_INT8):
+    """Export Resemblyzer's LSTM to ONNX and write a dynamically INT8-quantized copy"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from resemblyzer import VoiceEncoder
+    from resemblyzer.hparams import mel_n_channels, partials_n_frames
+
+    encoder = VoiceEncoder(device="cpu")
+    dummy_mels = torch.zeros(1, partials_n_frames, mel_n_channels)
+    torch.onnx.export(encoder, dummy_mels, model_path, opset_version=17,
+                      input_names=["mels"], output_names=["embeds"],
+                      dynamic_axes={"mels": {0: "batch", 1: "time"}, "embeds": {0: "batch"}})
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+class FastEncoder:
+    """Drop-in for VoiceEncoder.embed_utterance backed by the INT8 ONNX export"""
+
+    def __init__(self, model_path=ONNX_MODEL_INT8):
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+
+    def embed_utterance(self, wav, return_partials=False, rate=1.3, min_coverage=0.75):
+        """Same slicing, padding and averaging as Resemblyzer's embed_utterance"""
+        from resemblyzer import VoiceEncoder, audio
+
+        wav_slices, mel_slices = VoiceEncoder.compute_partial_slices(len(wav), rate, min_coverage)
+        max_wave_length = wav_slices[-1].stop
+        if max_wave_length >= len(wav):
+            wav = np.pad(wav, (0, max_wave_length - len(wav)), "constant")
+
+        mel = audio.wav_to_mel_spectrogram(wav)
+        mels = np.array([mel[s] for s in mel_slices])
+        partial_embeds = self.session.run(None, {"mels": mels})[0]
+
+        raw_embed = np.mean(partial_embeds, axis=0)
+        embed = raw_embed / np.linalg.norm(raw_embed, 2)
+
+        if return_partials:
+            return embed, partial_embeds, wav_slices
+        return embed
+
+if __name__ == "__main__":
+    print(f"✅ Quantized voice encoder written to: {export_onnx()}")
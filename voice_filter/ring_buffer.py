@@ -0,0 +1,50 @@
+import numpy as np
+
+class RingBuffer:
+    """Fixed-size circular audio buffer backed by a preallocated NumPy array"""
+
+    def __init__(self, size, dtype=np.float32):
+        self.buffer = np.zeros(size, dtype=dtype)
+        self.pos = 0  # Next write index
+        self.filled = 0  # Number of valid samples
+
+    def __len__(self):
+        return self.filled
+
+    def write(self, audio):
+        """Append samples, overwriting the oldest ones when full"""
+        size = len(self.buffer)
+        n = len(audio)
+
+        if n >= size:
+            self.buffer[:] = audio[-size:]
+            self.pos = 0
+            self.filled = size
+            return
+
+        end = self.pos + n
+        if end <= size:
+            self.buffer[self.pos:end] = audio
+        else:
+            # Wrap around the end of the buffer
+            split = size - self.pos
+            self.buffer[self.pos:] = audio[:split]
+            self.buffer[:n - split] = audio[split:]
+
+        self.pos = end % size
+        self.filled = min(self.filled + n, size)
+
+    def latest(self, n=None):
+        """Return a contiguous copy of the most recent n samples (all by default)"""
+        size = len(self.buffer)
+        n = self.filled if n is None else min(n, self.filled)
+        start = (self.pos - n) % size
+
+        if start + n <= size:
+            return self.buffer[start:start + n].copy()
+        return np.concatenate((self.buffer[start:], self.buffer[:self.pos]))
+
+    def clear(self):
+        """Drop all buffered samples"""
+        self.pos = 0
+        self.filled = 0
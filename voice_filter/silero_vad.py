@@ -0,0 +1,49 @@
+import numpy as np
+
+class SileroVAD:
+    """Silero VAD (v5 ONNX model) run on 512-sample windows at 16 kHz"""
+
+    window = 512  # Samples per inference at 16 kHz
+    context = 64  # Trailing samples of the previous window the model expects
+
+    def __init__(self, model_path, threshold=0.5, sample_rate=16000):
+        import onnxruntime
+
+        opts = onnxruntime.SessionOptions()
+        opts.intra_op_num_threads = 1  # Tiny model: threading overhead outweighs the gain
+        opts.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=opts, providers=['CPUExecutionProvider'])
+
+        self.threshold = threshold
+        self._sr = np.array(sample_rate, dtype=np.int64)
+        self._input = np.zeros((1, self.context + self.window), dtype=np.float32)
+        self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        self._fill = 0
+        self.last_prob = 0.0
+
+    def reset(self):
+        """Clear the recurrent state and any partial window"""
+        self._input.fill(0.0)
+        self._state.fill(0.0)
+        self._fill = 0
+        self.last_prob = 0.0
+
+    def process(self, audio):
+        """Feed float32 samples; True if the most recent full window was speech"""
+        pos = 0
+        while pos < len(audio):
+            take = min(self.window - self._fill, len(audio) - pos)
+            start = self.context + self._fill
+            self._input[0, start:start + take] = audio[pos:pos + take]
+            self._fill += take
+            pos += take
+
+            if self._fill == self.window:
+                prob, self._state = self.session.run(
+                    None, {'input': self._input, 'state': self._state, 'sr': self._sr})
+                self.last_prob = float(prob[0, 0])
+                self._input[0, :self.context] = self._input[0, -self.context:]
+                self._fill = 0
+
+        return self.last_prob > self.threshold
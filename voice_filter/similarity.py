@@ -0,0 +1,22 @@
+import numpy as np
+
+# SimSIMD is optional: its dot kernels beat np.dot's dispatch overhead on 256-d vectors
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+def as_embedding(emb):
+    """Return an embedding as contiguous float32, the layout the dot kernels expect"""
+    return np.ascontiguousarray(emb, dtype=np.float32)
+
+def similarity(user_embedding, current_embedding):
+    """Cosine similarity of two L2-normalized embeddings (Resemblyzer's are), i.e. their dot
+
+    user_embedding must already be contiguous float32 (see as_embedding); it is prepared once
+    at load time rather than converted on every call.
+    """
+    current_embedding = as_embedding(current_embedding)  # No-op for the encoder's own output
+    if simsimd is not None:
+        return float(simsimd.dot(user_embedding, current_embedding))
+    return float(np.dot(user_embedding, current_embedding))
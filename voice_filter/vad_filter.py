@@ -1,71 +1,79 @@
 import webrtcvad
 import numpy as np
-from resemblyzer import VoiceEncoder, preprocess_wav
 from pathlib import Path
 import soundfile as sf
 import os
 
+from voice_filter.encoder import get_encoder, load_voice_embedding
+from voice_filter.kernels import f32_to_i16
+from voice_filter.similarity import as_embedding, similarity
+
 vad = webrtcvad.Vad(3)  # Aggressiveness: 0–3
-encoder = VoiceEncoder()
 
 # Voice similarity threshold (0-1, higher = more strict)
 VOICE_SIMILARITY_THRESHOLD = 0.7
 
+# Reusable PCM16 scratch for float input (30 ms at up to 48 kHz)
+_scratch = np.empty(int(48000 * 0.03), dtype=np.int16)
+
 def is_speech(audio, sample_rate):
     """Check if audio contains speech using VAD"""
     try:
-        # Ensure audio is the right length for WebRTC VAD
         # WebRTC VAD requires specific frame lengths: 10, 20, or 30ms
-        frame_length_ms = len(audio) * 1000 / sample_rate
+        if len(audio) < sample_rate // 100:  # Minimum 10ms
+            return False
         
         # If frame is too long, take the last 30ms
-        if frame_length_ms > 30:
-            samples_30ms = int(sample_rate * 0.03)  # 30ms in samples
-            audio = audio[-samples_30ms:]
+        n = min(len(audio), int(sample_rate * 0.03))
+        audio = audio[-n:]
         
-        # Convert float32 [-1, 1] to int16
-        int16_audio = (audio * 32767).astype(np.int16).tobytes()
+        # int16 streams are already PCM16; only float32 [-1, 1] needs scaling
+        if audio.dtype == np.int16:
+            return vad.is_speech(audio.tobytes(), sample_rate)
         
-        # Check if we have enough data
-        if len(int16_audio) < 320:  # Minimum 20ms at 16kHz
-            return False
-            
-        return vad.is_speech(int16_audio, sample_rate)
+        scratch = _scratch[:n]
+        f32_to_i16(np.asarray(audio, dtype=np.float32), scratch)  # One clipped pass, no temporaries
+        return vad.is_speech(scratch.tobytes(), sample_rate)
     except Exception as e:
         # If VAD fails, assume it's speech to be safe
         print(f"VAD error: {e}")
         return True
 
+def is_speech_int16(int16_audio_bytes, sample_rate):
+    """VAD on a PCM16 frame that is already exactly 10, 20 or 30 ms long"""
+    return vad.is_speech(int16_audio_bytes, sample_rate)
+
 def load_user_voice_embedding(voice_sample_path=None):
     """Load or create user voice embedding for voice identification"""
     if voice_sample_path and os.path.exists(voice_sample_path):
-        # Load existing voice sample
-        wav = preprocess_wav(voice_sample_path)
-        return encoder.embed_utterance(wav)
+        # Load existing voice sample (cached until the file changes)
+        return load_voice_embedding(voice_sample_path)
     else:
         # Return None if no voice sample available
         return None
 
+def user_voice_similarity(audio, sample_rate, user_embedding):
+    """Similarity of the audio to the user's voice, or None if it is too short to judge"""
+    # Resemblyzer needs at least 0.5 seconds
+    if len(audio) < sample_rate * 0.5:
+        return None
+    
+    # Preprocess audio for Resemblyzer (imported here so VAD-only use never loads torch)
+    from resemblyzer import preprocess_wav
+    wav = preprocess_wav(audio)
+    
+    # Get embedding for current audio
+    current_embedding = as_embedding(get_encoder().embed_utterance(wav))
+    return similarity(user_embedding, current_embedding)
+
 def is_user_voice(audio, sample_rate, user_embedding):
     """Check if the audio matches the user's voice"""
     if user_embedding is None:
         return True  # If no user embedding, allow all speech through
     
     try:
-        # Ensure audio is the right length for Resemblyzer
-        if len(audio) < sample_rate * 0.5:  # Need at least 0.5 seconds
-            return False
-            
-        # Preprocess audio for Resemblyzer
-        wav = preprocess_wav(audio)
-        
-        # Get embedding for current audio
-        current_embedding = encoder.embed_utterance(wav)
-        
-        # Calculate similarity
-        similarity = np.dot(user_embedding, current_embedding)
-        
-        return similarity > VOICE_SIMILARITY_THRESHOLD
+        score = user_voice_similarity(audio, sample_rate, user_embedding)
+        return score is not None and score > VOICE_SIMILARITY_THRESHOLD
     except Exception as e:
         print(f"Error in voice identification: {e}")
-        return True  # Default to allowing speech through on error
\ No newline at end of file
+        return True  # Default to allowing speech through on error
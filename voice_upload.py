@@ -11,6 +11,8 @@ import numpy as np
 from pathlib import Path
 import argparse
 
+from voice_filter.kernels import normalize_inplace
+
 class VoiceUploader:
     def __init__(self):
         self.audio_samples_dir = Path("audio_samples")
@@ -36,8 +38,8 @@ class VoiceUploader:
             
             print(f"📁 Processing file: {file_path}")
             
-            # Load audio file
-            audio_data, sample_rate = sf.read(file_path)
+            # Load audio file (float32 halves the memory of soundfile's float64 default)
+            audio_data, sample_rate = sf.read(file_path, dtype='float32')
             
             # Convert to mono if stereo
             if len(audio_data.shape) > 1:
@@ -46,14 +48,20 @@ class VoiceUploader:
             
             # Resample to 16kHz if needed
             if sample_rate != 16000:
-                from scipy.signal import resample
-                num_samples = int(len(audio_data) * 16000 / sample_rate)
-                audio_data = resample(audio_data, num_samples)
+                # Polyphase resampling: faster and far lighter on memory than an FFT resample
+                try:
+                    import soxr
+                    audio_data = soxr.resample(audio_data, sample_rate, 16000, quality='HQ')
+                except ImportError:
+                    import librosa
+                    audio_data = librosa.resample(audio_data, orig_sr=sample_rate, target_sr=16000,
+                                                  res_type='soxr_hq')
                 sample_rate = 16000
                 print(f"🔄 Resampled to 16kHz")
             
-            # Normalize audio
-            audio_data = audio_data / np.max(np.abs(audio_data))
+            # Normalize audio (single fused pass over a float32 copy)
+            audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+            normalize_inplace(audio_data)
             
             # Save as WAV
             target_path = self.audio_samples_dir / target_name
@@ -92,7 +100,7 @@ class VoiceUploader:
     def validate_voice_file(self, file_path):
         """Validate voice file quality"""
         try:
-            audio_data, sample_rate = sf.read(file_path)
+            audio_data, sample_rate = sf.read(file_path, dtype='float32')
             duration = len(audio_data) / sample_rate
             
             print(f"🔍 Validating voice file: {file_path}")
@@ -107,8 +115,11 @@ class VoiceUploader:
             else:
                 print("✅ Duration is good")
             
+            # abs is computed once and shared by the level and silence checks
+            abs_data = np.abs(audio_data, out=audio_data)
+            
             # Check audio level
-            max_level = np.max(np.abs(audio_data))
+            max_level = abs_data.max()
             if max_level < 0.1:
                 print("⚠️  Warning: Audio level is very low")
             elif max_level > 0.95:
@@ -118,8 +129,8 @@ class VoiceUploader:
             
             # Check for silence
             silence_threshold = 0.01
-            silent_samples = np.sum(np.abs(audio_data) < silence_threshold)
-            silence_percentage = (silent_samples / len(audio_data)) * 100
+            silent_samples = np.count_nonzero(abs_data < silence_threshold)
+            silence_percentage = (silent_samples / abs_data.size) * 100
             
             if silence_percentage > 50:
                 print("⚠️  Warning: File contains a lot of silence")
@@ -1,10 +1,9 @@
 import json
 import os
-import vosk
 import numpy as np
 import threading
+import queue
 import time
-from collections import deque
 
 class WakeWordDetector:
     def __init__(self, model_path=None, wake_words=None, sample_rate=16000):
@@ -21,7 +20,10 @@ class WakeWordDetector:
         self.model = None
         self.rec = None
         self.is_listening = False
-        self.audio_buffer = deque(maxlen=sample_rate * 5)  # 5 second buffer
+        
+        # Recognition runs on a worker thread; the audio callback only enqueues bytes
+        self._q = queue.Queue(maxsize=64)  # ~2 s of 30 ms frames
+        self._thread = None
         
         # Callback function for when wake word is detected
         self.wake_word_callback = None
@@ -33,6 +35,7 @@ class WakeWordDetector:
         """Load Vosk model for speech recognition"""
         if model_path and os.path.exists(model_path):
             try:
+                import vosk  # Deferred: only needed once there is a model to load
                 self.model = vosk.Model(model_path)
                 self.rec = vosk.KaldiRecognizer(self.model, self.sample_rate)
                 print(f"✅ Vosk model loaded from: {model_path}")
@@ -49,49 +52,57 @@ class WakeWordDetector:
         self.wake_word_callback = callback
     
     def add_audio_data(self, audio_data):
-        """Add audio data to the buffer for processing"""
-        if self.rec is None:
-            return
-        
-        # Convert to bytes if needed
-        if audio_data.dtype != np.int16:
-            audio_data = (audio_data * 32767).astype(np.int16)
-        
-        # Add to buffer
-        self.audio_buffer.extend(audio_data.tolist())
-        
-        # Process audio in chunks (reduced frequency to lower CPU load)
-        if len(self.audio_buffer) >= self.sample_rate * 3:  # Process 3-second chunks
-            self._process_audio_chunk()
-    
-    def _process_audio_chunk(self):
-        """Process audio chunk for wake word detection"""
+        """Add audio data for processing"""
         if self.rec is None or not self.is_listening:
             return
         
+        # Raw PCM16 bytes (from a RawStream) go to Vosk as-is; arrays are converted first
+        if not isinstance(audio_data, bytes):
+            if audio_data.dtype != np.int16:
+                audio_data = (audio_data * 32767).astype(np.int16)
+            audio_data = audio_data.tobytes()
+        
+        # Vosk is a streaming recognizer: feed only the new samples, it buffers internally.
+        # Dropping a frame is preferable to blocking the audio thread.
+        try:
+            self._q.put_nowait(audio_data)
+        except queue.Full:
+            pass
+    
+    def _run(self):
+        """Worker loop: feed queued audio to Vosk until the None sentinel"""
+        while True:
+            audio_bytes = self._q.get()
+            if audio_bytes is None:
+                break
+            self._process_audio(audio_bytes)
+    
+    def _process_audio(self, audio_bytes):
+        """Feed new audio to Vosk and check the (partial) transcript for wake words"""
         try:
-            # Get audio chunk
-            audio_chunk = np.array(list(self.audio_buffer))
-            audio_bytes = audio_chunk.tobytes()
-            
-            # Process with Vosk
             if self.rec.AcceptWaveform(audio_bytes):
-                result = json.loads(self.rec.Result())
-                text = result.get('text', '').lower().strip()
-                
+                text = json.loads(self.rec.Result()).get('text', '').lower().strip()
                 if text:
                     print(f"🎤 Detected: '{text}'")
-                    
-                    # Check for wake words
-                    for wake_word in self.wake_words:
-                        if wake_word.lower() in text:
-                            print(f"🚨 WAKE WORD DETECTED: '{wake_word}'")
-                            if self.wake_word_callback:
-                                self.wake_word_callback(wake_word, text)
-                            break
+            else:
+                # Partials let a wake word fire mid-utterance instead of at the final result
+                text = json.loads(self.rec.PartialResult()).get('partial', '').lower().strip()
+            
+            if text:
+                self._check_wake_words(text)
         except Exception as e:
             print(f"Error processing audio: {e}")
     
+    def _check_wake_words(self, text):
+        """Fire the callback for the first wake word contained in text"""
+        for wake_word in self.wake_words:
+            if wake_word.lower() in text:
+                print(f"🚨 WAKE WORD DETECTED: '{wake_word}'")
+                self.rec.Reset()  # Don't trigger again on the same utterance's later partials
+                if self.wake_word_callback:
+                    self.wake_word_callback(wake_word, text)
+                break
+    
     def start_listening(self):
         """Start wake word detection"""
         if self.rec is None:
@@ -99,12 +110,19 @@ class WakeWordDetector:
             return False
         
         self.is_listening = True
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
         print(f"👂 Wake word detection started. Listening for: {', '.join(self.wake_words)}")
         return True
     
     def stop_listening(self):
         """Stop wake word detection"""
         self.is_listening = False
+        if self._thread is not None:
+            self._q.put(None)
+            self._thread.join(timeout=1.0)
+            self._thread = None
         print("🔇 Wake word detection stopped")
     
     def reset(self):